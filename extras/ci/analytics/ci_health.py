@@ -8,22 +8,47 @@ then generates health.html for the analytics dashboard.
 Designed to run on a 15-minute schedule, separately from the nightly
 full analytics generation.
 
+Each run appends a snapshot to health_snapshots.jsonl in the output
+directory. Once records are a week old they are compacted into hourly
+rollups in per-month health_snapshots_YYYY-MM.jsonl.gz archives, so the
+hot file stays at roughly eight days of samples and older history can be
+reviewed or pruned one month at a time.
+
 Usage:
     python3 ci_health.py --output ci_analytics
     python3 ci_health.py --repo OWNER/REPO --output ./output
 """
 
 import argparse
+import contextlib
+import gzip
 import html as html_mod
 import json
+import mmap
 import os
+import re
+import shutil
+import stat
+import string
 import subprocess
 import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib codec is used otherwise
+    orjson = None
 
-# Import the page template from ci_visualization
+# Import the page template from ci_visualization and gh_api helpers from extras/ci
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from ci_visualization import page_template, chart_section, DOWNLOAD_JS
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from gh_api import gh_api_list, parse_merge_queue_pr_number
+from ci_visualization import page_template, chart_section, CHARTJS_CDN, DOWNLOAD_JS
 from ci_hosted_runner_usage import (
     DEFAULT_HOSTED_RUNNER_CAP,
     HOSTED_LABEL_PREFIXES,
@@ -32,6 +57,8 @@ from ci_hosted_runner_usage import (
 
 
 DEFAULT_REPO = "shader-slang/slang"
+CI_WORKFLOW_FILE = "ci.yml"
+QUEUE_STATUS_CACHE_TTL = 60  # seconds
 
 # GCP GPU quota configuration
 GPU_QUOTA_PROJECT = "slang-runners"
@@ -82,7 +109,32 @@ def _round_time(hhmm, interval=DISPLAY_INTERVAL_MIN):
     m = (m // interval) * interval
     return f"{h:02d}:{m:02d}"
 SNAPSHOTS_FILE = "health_snapshots.jsonl"
-CHARTJS_CDN = "https://cdn.jsdelivr.net/npm/chart.js"
+SNAPSHOT_HOT_DAYS = 7
+SNAPSHOT_ARCHIVE_FILE = "health_snapshots_{month}.jsonl.gz"
+_SNAPSHOT_TIMESTAMP_RE = re.compile(rb'\{\s*"timestamp"\s*:\s*"([^"]*)"')
+
+
+def _json_dumps(obj):
+    """Serialize obj to compact UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data):
+    """Parse JSON from str or bytes (orjson when available).
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers
+    only need to catch the latter.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _js_literal(obj):
+    """Serialize obj as a JSON literal for embedding in inline JS."""
+    return _json_dumps(obj).decode("utf-8")
 
 
 def _copy_gpu_quota_metrics(metrics):
@@ -290,8 +342,72 @@ def parse_args():
     return parser.parse_args()
 
 
-def fetch_queue_status(repo):
-    """Run ci-queue-status.py --json and return parsed output."""
+def _queue_status_cache_path(repo):
+    """Return the cache file for repo, or None if no private dir is usable.
+
+    The cache lives in a per-user 0700 directory under the temp dir so other
+    local users cannot plant or read it. Caching is skipped on platforms
+    without os.getuid and when the directory is not ours or is shared.
+    """
+    if not hasattr(os, "getuid"):
+        return None
+    uid = os.getuid()
+    cache_dir = os.path.join(tempfile.gettempdir(), f"ci_health_{uid}")
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        st = os.lstat(cache_dir)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != uid or st.st_mode & 0o077:
+        return None
+    return os.path.join(cache_dir, f"queue_status_{repo.replace('/', '_')}.json")
+
+
+def _read_queue_status_cache(path, ttl):
+    """Return cached queue status if it is ours and 0 <= age < ttl seconds."""
+    flags = os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0)
+    try:
+        with open(os.open(path, flags), "rb") as f:
+            st = os.fstat(f.fileno())
+            if hasattr(os, "getuid") and st.st_uid != os.getuid():
+                return None
+            if not 0 <= time.time() - st.st_mtime < ttl:
+                return None
+            return _json_loads(f.read())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_queue_status_cache(path, payload):
+    """Atomically publish queue status output; failures are non-fatal."""
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".queue_status_", suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not cache queue status: {e}", file=sys.stderr)
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+
+def fetch_queue_status(repo, cache_ttl=QUEUE_STATUS_CACHE_TTL):
+    """Run ci-queue-status.py --json and return parsed output.
+
+    Complete (non-partial) output is cached in a private per-user temp
+    directory for cache_ttl seconds so back-to-back invocations share one
+    sweep of the GitHub API. Pass cache_ttl=0 to always run the script.
+    """
+    cache_path = _queue_status_cache_path(repo) if cache_ttl > 0 else None
+    if cache_path is not None:
+        cached = _read_queue_status_cache(cache_path, cache_ttl)
+        if cached is not None:
+            return cached
+
     script = os.path.join(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
         "ci-queue-status.py",
@@ -302,27 +418,30 @@ def fetch_queue_status(repo):
         print(f"Warning: ci-queue-status.py failed: {result.stderr}", file=sys.stderr)
         return None
     try:
-        return json.loads(result.stdout)
+        data = _json_loads(result.stdout)
     except json.JSONDecodeError as e:
         print(f"Warning: invalid JSON from ci-queue-status.py: {e}", file=sys.stderr)
         return None
+    if cache_path is not None and isinstance(data, dict) and not data.get("partial"):
+        _write_queue_status_cache(cache_path, result.stdout)
+    return data
 
 
 def fetch_recent_failures(repo):
     """Fetch recent CI workflow failures (last 3 hours)."""
-    # Use gh CLI directly for a quick query
-    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
-    from gh_api import gh_api_list
-
     now = datetime.now(timezone.utc)
     cutoff_dt = now - timedelta(hours=3)
     # Query a wider creation window than the displayed update window so a
     # longer-running CI job that finishes recently is still eligible.
     created_from = (cutoff_dt - timedelta(hours=6)).strftime("%Y-%m-%dT%H:%M:%SZ")
     created_to = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    # Not cached with ETag/If-None-Match: the created range moves on every
+    # poll, so each request is a new URL that can never revalidate, and the
+    # output directory is a fresh checkout each run with nowhere to keep
+    # the cached body between polls.
     runs, err = gh_api_list(
-        f"repos/{repo}/actions/runs?status=completed&per_page=100"
-        f"&created={created_from}..{created_to}",
+        f"repos/{repo}/actions/workflows/{CI_WORKFLOW_FILE}/runs"
+        f"?status=failure&per_page=100&created={created_from}..{created_to}",
         "workflow_runs",
     )
     if err:
@@ -331,10 +450,6 @@ def fetch_recent_failures(repo):
     cutoff = cutoff_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
     failures = []
     for run in (runs or []):
-        if run.get("name") != "CI":
-            continue
-        if run.get("conclusion") != "failure":
-            continue
         if run.get("event") == "merge_group":
             continue  # Merge queue failures shown separately
         event_time = run.get("updated_at") or run.get("created_at", "")
@@ -354,9 +469,6 @@ def fetch_merge_queue_status(repo):
 
     Returns a dict with 'recent' runs, 'summary' counts, and partial status.
     """
-    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
-    from gh_api import gh_api_list, parse_merge_queue_pr_number
-
     now = datetime.now(timezone.utc)
     cutoff_dt = now - timedelta(hours=24)
     cutoff = cutoff_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -402,12 +514,17 @@ def fetch_merge_queue_status(repo):
     return {"recent": recent, "summary": counts, "partial": False, "errors": []}
 
 
-def record_snapshot(queue_data, output_dir, gpu_quota=None, mq_data=None, hosted_runner_usage=None):
-    """Append a runner status snapshot to the JSONL time-series file."""
+def record_snapshot(
+    queue_data, output_dir, gpu_quota=None, mq_data=None, hosted_runner_usage=None, now=None
+):
+    """Append a runner status snapshot to the JSONL time-series file.
+
+    now is the run's clock sample; it defaults to the current UTC time.
+    """
     if not queue_data and not gpu_quota and not mq_data and not hosted_runner_usage:
         return
 
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     snapshot = {"timestamp": now.strftime("%Y-%m-%dT%H:%M:%SZ")}
 
     if queue_data:
@@ -425,16 +542,17 @@ def record_snapshot(queue_data, output_dir, gpu_quota=None, mq_data=None, hosted
         snapshot["runs_in_progress"] = summary.get("runs_in_progress", 0)
 
         # Per-group busy/total from runner data
-        groups = {}
+        groups = defaultdict(lambda: [0, 0])  # group -> [busy, total]
         for r in queue_data.get("self_hosted_runners", []):
-            g = r.get("group", "Other")
-            if g not in groups:
-                groups[g] = {"busy": 0, "total": 0}
-            if r.get("status") == "online":
-                groups[g]["total"] += 1
-                if r.get("busy"):
-                    groups[g]["busy"] += 1
-        snapshot["runner_groups"] = groups
+            slot = groups[r.get("group", "Other")]
+            if r.get("status") != "online":
+                continue
+            slot[1] += 1
+            if r.get("busy"):
+                slot[0] += 1
+        snapshot["runner_groups"] = {
+            g: {"busy": busy, "total": total} for g, (busy, total) in groups.items()
+        }
 
         # Per-group queue depth
         queue_groups = {}
@@ -451,12 +569,11 @@ def record_snapshot(queue_data, output_dir, gpu_quota=None, mq_data=None, hosted
             snapshot["gpu_quota_partial"] = True
             if gpu_quota.get("errors"):
                 snapshot["gpu_quota_errors"] = gpu_quota["errors"]
+        # Only the metric-keyed form is written; the legacy T4-only
+        # "gpu_quota" field duplicated it and is still accepted on read.
         by_metric = _normalize_gpu_quota_by_metric(gpu_quota)
         if by_metric:
             snapshot["gpu_quota_by_metric"] = by_metric
-            legacy = by_metric.get(GPU_QUOTA_METRIC)
-            if legacy:
-                snapshot["gpu_quota"] = legacy.get("regions", {})
 
     # Merge queue summary
     if mq_data:
@@ -470,56 +587,251 @@ def record_snapshot(queue_data, output_dir, gpu_quota=None, mq_data=None, hosted
     if hosted_runner_usage:
         snapshot["hosted_runner_usage"] = hosted_runner_usage
 
-    # Append to JSONL file (kept indefinitely, ~55KB/day)
+    # Append to JSONL file (~55KB/day; rotate_snapshots compacts older
+    # days). A single O_APPEND write keeps each appended record intact;
+    # overlap with rotate_snapshots is prevented by the workflow's
+    # concurrency group, not by this write.
     os.makedirs(output_dir, exist_ok=True)
     path = os.path.join(output_dir, SNAPSHOTS_FILE)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(snapshot) + "\n")
+    payload = _json_dumps(snapshot) + b"\n"
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+    fd = os.open(path, flags, 0o644)
+    try:
+        written = os.write(fd, payload)
+    finally:
+        os.close(fd)
+    if written != len(payload):
+        raise OSError(f"short write to {path}: {written} of {len(payload)} bytes")
+
+
+def _iter_jsonl_tail(buf):
+    """Yield JSONL lines from end to start of a bytes-like buffer.
+
+    Meant for an mmap of the snapshot file: the page cache backs the
+    data and only the lines actually yielded are copied out.
+    """
+    end = len(buf)
+    while end > 0:
+        start = buf.rfind(b"\n", 0, end) + 1
+        if start < end:
+            yield buf[start:end]
+        end = start - 1
 
 
-def load_snapshots(output_dir, hours=24):
+def load_snapshots(output_dir, hours=24, now=None):
     """Load snapshots from the last N hours (tail-read for large files)."""
     path = os.path.join(output_dir, SNAPSHOTS_FILE)
     if not os.path.exists(path):
         return []
 
-    now = datetime.now(timezone.utc)
-    from datetime import timedelta
+    now = now or datetime.now(timezone.utc)
     cutoff = now - timedelta(hours=hours)
     cutoff_str = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    def _iter_jsonl_tail(fp, block_size=64 * 1024):
-        """Yield JSONL lines from end to start without loading full file."""
-        fp.seek(0, os.SEEK_END)
-        buf = ""
-        pos = fp.tell()
-        while pos > 0:
-            read_size = block_size if pos >= block_size else pos
-            pos -= read_size
-            fp.seek(pos)
-            buf = fp.read(read_size) + buf
-            lines = buf.split("\n")
-            buf = lines[0]
-            for line in reversed(lines[1:]):
-                if line:
-                    yield line
-        if buf:
-            yield buf
+    cutoff_bytes = cutoff_str.encode("ascii")
 
     snapshots_rev = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in _iter_jsonl_tail(f):
-            try:
-                snap = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            ts = snap.get("timestamp", "")
-            if ts < cutoff_str:
-                break
-            snapshots_rev.append(snap)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in _iter_jsonl_tail(mm):
+                # record_snapshot writes the timestamp first, and ISO-8601
+                # strings sort lexically, so stop before parsing an old line.
+                match = _SNAPSHOT_TIMESTAMP_RE.match(line)
+                if match and match.group(1) < cutoff_bytes:
+                    break
+                try:
+                    snap = _json_loads(line)
+                except json.JSONDecodeError:
+                    continue
+                ts = snap.get("timestamp", "")
+                if ts < cutoff_str:
+                    break
+                snapshots_rev.append(snap)
     return list(reversed(snapshots_rev))
 
 
+def _sum_numeric_leaves(total, value):
+    """Add the numeric leaves of nested dict value into total."""
+    for key, v in value.items():
+        if isinstance(v, bool):
+            continue
+        if isinstance(v, (int, float)):
+            total[key] = total.get(key, 0) + v
+        elif isinstance(v, dict):
+            _sum_numeric_leaves(total.setdefault(key, {}), v)
+        elif isinstance(v, str):
+            total[key] = v  # labels such as a quota metric's display name
+    return total
+
+
+def _scale_numeric_leaves(total, n):
+    return {
+        key: _scale_numeric_leaves(v, n) if isinstance(v, dict)
+        else v if isinstance(v, str)
+        else round(v / n, 2)
+        for key, v in total.items()
+    }
+
+
+def _mean_numeric_leaves(values):
+    """Average the numeric leaves of a list of nested dicts.
+
+    A leaf missing from a sample counts as 0; string leaves keep the
+    latest value.
+    """
+    total = {}
+    for value in values:
+        _sum_numeric_leaves(total, value)
+    return _scale_numeric_leaves(total, len(values))
+
+
+def _hosted_usage_counts(usage):
+    """Reduce a hosted-runner usage sample to the nested counts we roll up."""
+    in_progress = usage.get("in_progress", {})
+    return {
+        "cap": usage.get("cap", DEFAULT_HOSTED_RUNNER_CAP),
+        "in_progress": {
+            "total": in_progress.get("total", 0),
+            "by_label": {row["label"]: row["count"] for row in in_progress.get("by_label", [])},
+        },
+        "queued": {"total": usage.get("queued", {}).get("total", 0)},
+    }
+
+
+def _rollup_hour(snapshots):
+    """Average one hour of snapshots into a single summary record.
+
+    Each section (queue, GPU quota, merge queue, hosted runners) is
+    averaged over its own non-partial samples; a section whose samples
+    were all partial keeps only its partial marker.
+    """
+    rollup = {
+        "timestamp": snapshots[0]["timestamp"][:13] + ":00:00Z",
+        "samples": len(snapshots),
+    }
+
+    # Records written without queue data (e.g. only GPU quota was sampled)
+    # carry no queue fields and must not be averaged in as zeros.
+    complete = [s for s in snapshots if "jobs_queued" in s and not s.get("queue_partial")]
+    if complete:
+        n = len(complete)
+        for field in _QUEUE_HISTORY_FIELDS:
+            rollup[field] = round(sum(s.get(field, 0) for s in complete) / n, 2)
+        rollup["runner_groups"] = _mean_numeric_leaves([s.get("runner_groups", {}) for s in complete])
+        queue_by_group = _mean_numeric_leaves([s.get("queue_by_group", {}) for s in complete])
+        if queue_by_group:
+            rollup["queue_by_group"] = queue_by_group
+    else:
+        rollup["queue_partial"] = True
+
+    quotas = [
+        _snapshot_gpu_quota_by_metric(s) for s in snapshots if not s.get("gpu_quota_partial")
+    ]
+    quotas = [q for q in quotas if q]
+    if quotas:
+        rollup["gpu_quota_by_metric"] = _mean_numeric_leaves(quotas)
+    elif any(s.get("gpu_quota_partial") for s in snapshots):
+        rollup["gpu_quota_partial"] = True
+
+    merge_queue = [
+        s["merge_queue"] for s in snapshots
+        if s.get("merge_queue") and not s.get("merge_queue_partial")
+    ]
+    if merge_queue:
+        rollup["merge_queue"] = _mean_numeric_leaves(merge_queue)
+    elif any(s.get("merge_queue_partial") for s in snapshots):
+        rollup["merge_queue_partial"] = True
+
+    usages = [s["hosted_runner_usage"] for s in snapshots if s.get("hosted_runner_usage")]
+    hosted = [_hosted_usage_counts(u) for u in usages if not u.get("partial")]
+    if hosted:
+        usage = _mean_numeric_leaves(hosted)
+        by_label = usage["in_progress"]["by_label"]
+        usage["in_progress"]["by_label"] = [
+            {"label": label, "count": count} for label, count in sorted(by_label.items())
+        ]
+        rollup["hosted_runner_usage"] = usage
+    elif usages:
+        rollup["hosted_runner_usage"] = {"partial": True}
+    return rollup
+
+
+def rotate_snapshots(output_dir, keep_days=SNAPSHOT_HOT_DAYS, now=None):
+    """Compact snapshots older than keep_days into monthly hourly rollups.
+
+    Old records are averaged per hour and appended to gzip-compressed
+    health_snapshots_YYYY-MM.jsonl.gz archives, and the hot JSONL file is
+    rewritten with only the recent tail. Compaction only runs once the
+    oldest hot record is a day past the retention window, so it happens
+    about once a day without needing a stamp file.
+
+    The rewrite is read-copy-replace, so a record appended while it runs
+    would be lost; the health workflow's concurrency group keeps runs
+    from overlapping. The archive is appended before the hot file is
+    replaced, so a crash between the two duplicates that batch of hourly
+    rollups on the next run; duplicates share a timestamp and are
+    preferred over losing history.
+    """
+    path = os.path.join(output_dir, SNAPSHOTS_FILE)
+    if not os.path.exists(path):
+        return
+
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=keep_days)
+    cutoff_str = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
+    cutoff_bytes = cutoff_str.encode("ascii")
+    trigger_bytes = (cutoff - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ").encode("ascii")
+    oldest = None
+    with open(path, "rb") as f:
+        # Skip any truncated or garbled leading lines.
+        for line in f:
+            match = _SNAPSHOT_TIMESTAMP_RE.match(line)
+            if match:
+                oldest = match.group(1)
+                break
+    if oldest is None or oldest >= trigger_bytes:
+        return
+
+    by_hour = defaultdict(list)
+    tmp_path = path + ".tmp"
+    try:
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            for line in src:
+                match = _SNAPSHOT_TIMESTAMP_RE.match(line)
+                if match and match.group(1) >= cutoff_bytes:
+                    # Records are appended in time order: keep the rest as-is.
+                    dst.write(line)
+                    shutil.copyfileobj(src, dst)
+                    break
+                try:
+                    snap = _json_loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(snap, dict):
+                    continue
+                timestamp = snap.get("timestamp")
+                if not isinstance(timestamp, str):
+                    continue
+                if timestamp >= cutoff_str:
+                    # Recent record the prefilter missed (e.g. reordered keys).
+                    dst.write(line)
+                    continue
+                by_hour[timestamp[:13]].append(snap)
+
+        by_month = defaultdict(list)
+        for hour in sorted(by_hour):
+            if hour:
+                by_month[hour[:7]].append(_rollup_hour(by_hour[hour]))
+        for month, rollups in by_month.items():
+            archive = os.path.join(output_dir, SNAPSHOT_ARCHIVE_FILE.format(month=month))
+            with gzip.open(archive, "ab") as f:
+                f.write(b"".join(_json_dumps(r) + b"\n" for r in rollups))
+        os.replace(tmp_path, path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+
+
 def _deduplicate_snapshots(snapshots):
     """Keep only the latest snapshot per rounded time window."""
     by_window = {}
@@ -745,106 +1057,37 @@ def _lighten_hex(color, factor):
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
-def build_history_chart(snapshots):
-    """Build Chart.js HTML for 24h runner load history."""
-    if not snapshots:
-        return "<p>No history data yet. Snapshots accumulate every 15 minutes.</p>"
-
-    snapshots = _deduplicate_snapshots(snapshots)
-    timestamps = [_round_time(s["timestamp"][11:16]) for s in snapshots]
-
-    # Only show GCP VM groups, exclude scaler host and test runners
-    gcp_vm_groups = GCP_VM_GROUPS
-    palette = GCP_VM_PALETTE
-
-    # Queue depth over time. Partial queue samples are known undercounts,
-    # so render them as gaps rather than false-low points.
-    queued_data = [
-        None if s.get("queue_partial") else s.get("jobs_queued", 0)
-        for s in snapshots
-    ]
-    running_data = [
-        None if s.get("queue_partial") else s.get("jobs_running", 0)
-        for s in snapshots
-    ]
-
-    # Active CI workflow runs over time
-    runs_in_progress = [
-        None if s.get("queue_partial") else s.get("runs_in_progress", 0)
-        for s in snapshots
-    ]
-    runs_queued = [
-        None if s.get("queue_partial") else s.get("runs_queued", 0)
-        for s in snapshots
-    ]
+_QUEUE_HISTORY_FIELDS = ("jobs_queued", "jobs_running", "runs_in_progress", "runs_queued")
 
-    # Build per-group data series
-    group_series = {}
-    for g in gcp_vm_groups:
-        group_series[g] = [
-            None if s.get("queue_partial") else s.get("runner_groups", {}).get(g, {}).get("total", 0)
-            for s in snapshots
-        ]
 
-    gpu_quota_charts = _build_gpu_quota_charts(snapshots)
-
-    # Hosted-runner usage over time, with the per-org concurrency cap
-    # plotted as a horizontal limit line.
-    hosted_runner_chart = _build_hosted_runner_chart(snapshots)
-
-    # Merge queue cumulative success/failure from snapshots
-    # Each snapshot records the running 24h totals; we just plot them over time.
-    mq_success_data = [
-        None if s.get("merge_queue_partial") else s.get("merge_queue", {}).get("success", 0)
-        for s in snapshots
-    ]
-    mq_failure_data = [
-        None if s.get("merge_queue_partial") else s.get("merge_queue", {}).get("failure", 0)
-        for s in snapshots
-    ]
-    has_mq_snapshots = any(s.get("merge_queue") for s in snapshots)
-    partial_notes = []
-    if any(s.get("queue_partial") for s in snapshots):
-        partial_notes.append("queue")
-    if any(s.get("gpu_quota_partial") for s in snapshots):
-        partial_notes.append("GPU quota")
-    if any(s.get("merge_queue_partial") for s in snapshots):
-        partial_notes.append("merge queue")
-    partial_note_html = ""
-    if partial_notes:
-        partial_note_html = (
-            '<p style="color:#6c757d">Some '
-            + ", ".join(partial_notes)
-            + " samples were partial; affected chart points are rendered as gaps.</p>"
-        )
-
-    charts_html = (
-        chart_section("runnerHistory", "GCP Runner VMs",
-            "Number of GCP-provisioned runner VMs online per group, sampled every 15 minutes.")
-        + chart_section("workflowHistory", "Active CI Workflows",
-            "CI workflow runs currently in progress or queued.")
-        + chart_section("queueHistory", "Job Queue Depth",
-            "Individual jobs waiting in queue vs. actively running on runners.")
-    )
-    for quota_chart in gpu_quota_charts:
-        charts_html += chart_section(
-            quota_chart["id"],
-            f"{quota_chart['name']} GPU Usage vs. Quota",
-            f"{quota_chart['name']} GPUs in use per GCP region, stacked. "
-            "Dashed line shows total quota limit.",
-        )
-    if has_mq_snapshots:
-        charts_html += chart_section("mqHistory", "Merge Queue Checks (24h rolling)",
-            "Rolling 24-hour count of merge queue CI check outcomes, sampled every 15 minutes.")
-    if hosted_runner_chart:
-        charts_html += chart_section(
-            "hostedRunnerHistory",
-            "GitHub-Hosted Runner Usage vs. Cap",
-            "Hosted runners in use (stacked by label) and queued hosted-runner jobs, "
-            "sampled every 15 minutes. Dashed line shows the per-org concurrency cap.",
-        )
+def _queue_history_columns(snapshots, groups):
+    """Extract the queue-derived chart series in a single pass.
 
-    return f"""
+    Returns parallel lists keyed by snapshot field, plus a "runner_groups"
+    map of per-group online VM totals. Partial queue samples are known
+    undercounts, so they become gaps (None) rather than false-low points.
+    """
+    columns = {field: [] for field in _QUEUE_HISTORY_FIELDS}
+    group_series = {g: [] for g in groups}
+    for s in snapshots:
+        if s.get("queue_partial"):
+            for series in columns.values():
+                series.append(None)
+            for series in group_series.values():
+                series.append(None)
+            continue
+        for field, series in columns.items():
+            series.append(s.get(field, 0))
+        runner_groups = s.get("runner_groups", {})
+        for g, series in group_series.items():
+            series.append(runner_groups.get(g, {}).get("total", 0))
+    columns["runner_groups"] = group_series
+    return columns
+
+
+# Static Chart.js page skeleton for the load history section, parsed once at
+# import; build_history_chart only substitutes the data and section markup.
+_HISTORY_CHART_HTML = string.Template("""
 <div class="chart-section">
   <label>Time window: </label>
   <select id="historyRange" onchange="updateHistoryRange()">
@@ -853,39 +1096,40 @@ def build_history_chart(snapshots):
     <option value="24" selected>Last 24 hours</option>
   </select>
 </div>
-{partial_note_html}
-{charts_html}
-<script src="{CHARTJS_CDN}"></script>
+$partial_note_html
+$charts_html
+<script src="$chartjs_cdn"></script>
 <script>
-{DOWNLOAD_JS}
-// All snapshot data
-const allTimestamps = {json.dumps(timestamps)};
-const allRunnerData = {json.dumps({g: group_series[g] for g in gcp_vm_groups})};
-const allRunsInProgress = {json.dumps(runs_in_progress)};
-const allRunsQueued = {json.dumps(runs_queued)};
-const allJobsQueued = {json.dumps(queued_data)};
-const allJobsRunning = {json.dumps(running_data)};
-
-const gpuQuotaCharts = {json.dumps(gpu_quota_charts)};
-
-const hostedRunnerChart = {json.dumps(hosted_runner_chart)};
-
-const mqSuccessData = {json.dumps(mq_success_data)};
-const mqFailureData = {json.dumps(mq_failure_data)};
-const hasMqSnapshots = {json.dumps(has_mq_snapshots)};
+$download_js
+// All snapshot data, serialized as a single literal
+const {
+  timestamps: allTimestamps,
+  runnerData: allRunnerData,
+  runsInProgress: allRunsInProgress,
+  runsQueued: allRunsQueued,
+  jobsQueued: allJobsQueued,
+  jobsRunning: allJobsRunning,
+  gpuQuotaCharts,
+  hostedRunnerChart,
+  mqSuccessData,
+  mqFailureData,
+  hasMqSnapshots,
+  runnerColors,
+} = $history_json;
 
-const runnerColors = {json.dumps(palette)};
 const pointsPerHour = 4; // 15-min intervals
+// Series data is positional (index-aligned, one value per label), so charts
+// set `normalized: true` to let Chart.js skip re-scanning the data.
 
-let charts = {{}};
+let charts = {};
 
-function sliceLast(arr, n) {{ return arr.slice(-n); }}
+function sliceLast(arr, n) { return arr.slice(-n); }
 
-function thinLabels(labels, step) {{
+function thinLabels(labels, step) {
   return labels.map((l, i) => i % step === 0 ? l : '');
-}}
+}
 
-function buildCharts(hours) {{
+function buildCharts(hours) {
   const n = hours * pointsPerHour;
   const tickStep = hours >= 24 ? 2 : 1; // every 30min for 24h, 15min for shorter
   const labels = sliceLast(allTimestamps, n);
@@ -893,69 +1137,72 @@ function buildCharts(hours) {{
 
   // Destroy existing charts
   Object.values(charts).forEach(c => c.destroy());
-  charts = {{}};
+  charts = {};
 
   // Runner VMs
   const runnerDatasets = [];
-  for (const [g, color] of Object.entries(runnerColors)) {{
-    runnerDatasets.push({{
+  for (const [g, color] of Object.entries(runnerColors)) {
+    runnerDatasets.push({
       label: g,
       data: sliceLast(allRunnerData[g], n),
       borderColor: color,
       backgroundColor: color + '55',
       fill: true,
       tension: 0.3,
-    }});
-  }}
-  charts.runner = new Chart(document.getElementById('runnerHistory_canvas').getContext('2d'), {{
+    });
+  }
+  charts.runner = new Chart(document.getElementById('runnerHistory_canvas').getContext('2d'), {
     type: 'line',
-    data: {{ labels: displayLabels, datasets: runnerDatasets }},
-    options: {{
+    data: { labels: displayLabels, datasets: runnerDatasets },
+    options: {
       responsive: true,
-      scales: {{ y: {{ min: 0, stacked: true, title: {{ display: true, text: 'GCP VMs Online' }} }} }}
-    }}
-  }});
+      normalized: true,
+      scales: { y: { min: 0, stacked: true, title: { display: true, text: 'GCP VMs Online' } } }
+    }
+  });
 
   // Workflow runs
-  charts.workflow = new Chart(document.getElementById('workflowHistory_canvas').getContext('2d'), {{
+  charts.workflow = new Chart(document.getElementById('workflowHistory_canvas').getContext('2d'), {
     type: 'line',
-    data: {{
+    data: {
       labels: displayLabels,
       datasets: [
-        {{ label: 'Runs In Progress', data: sliceLast(allRunsInProgress, n), borderColor: '#0d6efd', fill: true, backgroundColor: 'rgba(13,110,253,0.1)', tension: 0.3 }},
-        {{ label: 'Runs Queued', data: sliceLast(allRunsQueued, n), borderColor: '#ffc107', fill: true, backgroundColor: 'rgba(255,193,7,0.1)', tension: 0.3 }}
+        { label: 'Runs In Progress', data: sliceLast(allRunsInProgress, n), borderColor: '#0d6efd', fill: true, backgroundColor: 'rgba(13,110,253,0.1)', tension: 0.3 },
+        { label: 'Runs Queued', data: sliceLast(allRunsQueued, n), borderColor: '#ffc107', fill: true, backgroundColor: 'rgba(255,193,7,0.1)', tension: 0.3 }
       ]
-    }},
-    options: {{
+    },
+    options: {
       responsive: true,
-      scales: {{ y: {{ min: 0, title: {{ display: true, text: 'Workflow Runs' }} }} }}
-    }}
-  }});
+      normalized: true,
+      scales: { y: { min: 0, title: { display: true, text: 'Workflow Runs' } } }
+    }
+  });
 
   // Job queue
-  charts.queue = new Chart(document.getElementById('queueHistory_canvas').getContext('2d'), {{
+  charts.queue = new Chart(document.getElementById('queueHistory_canvas').getContext('2d'), {
     type: 'line',
-    data: {{
+    data: {
       labels: displayLabels,
       datasets: [
-        {{ label: 'Jobs Queued', data: sliceLast(allJobsQueued, n), borderColor: '#dc3545', fill: true, backgroundColor: 'rgba(220,53,69,0.1)', tension: 0.3 }},
-        {{ label: 'Jobs Running', data: sliceLast(allJobsRunning, n), borderColor: '#0d6efd', fill: false, tension: 0.3 }}
+        { label: 'Jobs Queued', data: sliceLast(allJobsQueued, n), borderColor: '#dc3545', fill: true, backgroundColor: 'rgba(220,53,69,0.1)', tension: 0.3 },
+        { label: 'Jobs Running', data: sliceLast(allJobsRunning, n), borderColor: '#0d6efd', fill: false, tension: 0.3 }
       ]
-    }},
-    options: {{
+    },
+    options: {
       responsive: true,
-      scales: {{ y: {{ min: 0, title: {{ display: true, text: 'Jobs' }} }} }}
-    }}
-  }});
+      normalized: true,
+      scales: { y: { min: 0, title: { display: true, text: 'Jobs' } } }
+    }
+  });
 
   // GPU quota (stacked by region + limit line)
-  for (const quotaChart of gpuQuotaCharts) {{
+  for (const quotaChart of gpuQuotaCharts) {
     const gpuCanvas = document.getElementById(quotaChart.id + '_canvas');
     if (!gpuCanvas || Object.keys(quotaChart.regionData).length === 0) continue;
 
     const gpuDatasets = [];
-    for (const [region, color] of Object.entries(quotaChart.regionColors)) {{
-      gpuDatasets.push({{
+    for (const [region, color] of Object.entries(quotaChart.regionColors)) {
+      gpuDatasets.push({
         label: region,
         data: sliceLast(quotaChart.regionData[region] || [], n),
         borderColor: color,
@@ -963,10 +1210,10 @@ function buildCharts(hours) {{
         fill: 'stack',
         stack: 'usage',
         tension: 0.3,
-      }});
-    }}
+      });
+    }
     // Quota limit as a dashed line (not stacked)
-    gpuDatasets.push({{
+    gpuDatasets.push({
       label: 'Quota Limit',
       data: Array(labels.length).fill(quotaChart.limit),
       borderColor: '#dc3545',
@@ -974,41 +1221,42 @@ function buildCharts(hours) {{
       borderWidth: 2,
       pointRadius: 0,
       fill: false,
-    }});
-    charts[quotaChart.id] = new Chart(gpuCanvas.getContext('2d'), {{
+    });
+    charts[quotaChart.id] = new Chart(gpuCanvas.getContext('2d'), {
       type: 'line',
-      data: {{ labels: displayLabels, datasets: gpuDatasets }},
-      options: {{
+      data: { labels: displayLabels, datasets: gpuDatasets },
+      options: {
         responsive: true,
-        scales: {{
-          y: {{ min: 0, stacked: true, title: {{ display: true, text: quotaChart.name + ' GPUs' }} }}
-        }},
-        plugins: {{
-          tooltip: {{
-            callbacks: {{
-              afterBody: function(items) {{
+        normalized: true,
+        scales: {
+          y: { min: 0, stacked: true, title: { display: true, text: quotaChart.name + ' GPUs' } }
+        },
+        plugins: {
+          tooltip: {
+            callbacks: {
+              afterBody: function(items) {
                 const idx = items[0].dataIndex;
                 let total = 0;
-                for (const region of Object.keys(quotaChart.regionColors)) {{
+                for (const region of Object.keys(quotaChart.regionColors)) {
                   const ds = items[0].chart.data.datasets.find(d => d.label === region);
                   if (ds) total += ds.data[idx] || 0;
-                }}
+                }
                 return 'Total: ' + total + ' / ' + quotaChart.limit;
-              }}
-            }}
-          }}
-        }}
-      }}
-    }});
-  }}
+              }
+            }
+          }
+        }
+      }
+    });
+  }
 
   // Hosted-runner usage stacked by label, with the cap as a dashed line.
   const hostedCanvas = document.getElementById('hostedRunnerHistory_canvas');
-  if (hostedCanvas && hostedRunnerChart) {{
+  if (hostedCanvas && hostedRunnerChart) {
     const hostedDatasets = [];
-    for (const lbl of hostedRunnerChart.labels) {{
+    for (const lbl of hostedRunnerChart.labels) {
       const color = hostedRunnerChart.palette[lbl] || '#6c757d';
-      hostedDatasets.push({{
+      hostedDatasets.push({
         label: lbl,
         data: sliceLast(hostedRunnerChart.label_series[lbl] || [], n),
         borderColor: color,
@@ -1016,9 +1264,9 @@ function buildCharts(hours) {{
         fill: 'stack',
         stack: 'in_use',
         tension: 0.3,
-      }});
-    }}
-    hostedDatasets.push({{
+      });
+    }
+    hostedDatasets.push({
       label: 'Queued',
       data: sliceLast(hostedRunnerChart.queued_series, n),
       borderColor: '#ffc107',
@@ -1027,8 +1275,8 @@ function buildCharts(hours) {{
       fill: false,
       tension: 0.3,
       stack: 'queued',
-    }});
-    hostedDatasets.push({{
+    });
+    hostedDatasets.push({
       label: 'Cap (' + hostedRunnerChart.cap + ')',
       data: Array(labels.length).fill(hostedRunnerChart.cap),
       borderColor: '#dc3545',
@@ -1036,62 +1284,166 @@ function buildCharts(hours) {{
       borderWidth: 2,
       pointRadius: 0,
       fill: false,
-    }});
-    charts.hostedRunner = new Chart(hostedCanvas.getContext('2d'), {{
+    });
+    charts.hostedRunner = new Chart(hostedCanvas.getContext('2d'), {
       type: 'line',
-      data: {{ labels: displayLabels, datasets: hostedDatasets }},
-      options: {{
+      data: { labels: displayLabels, datasets: hostedDatasets },
+      options: {
         responsive: true,
-        scales: {{
-          y: {{ min: 0, stacked: true, title: {{ display: true, text: 'Hosted Runners' }} }}
-        }},
-        plugins: {{
-          tooltip: {{
-            callbacks: {{
-              afterBody: function(items) {{
+        normalized: true,
+        scales: {
+          y: { min: 0, stacked: true, title: { display: true, text: 'Hosted Runners' } }
+        },
+        plugins: {
+          tooltip: {
+            callbacks: {
+              afterBody: function(items) {
                 const idx = items[0].dataIndex;
                 const total = sliceLast(
                   hostedRunnerChart.total_series || [], n
                 )[idx];
                 if (total == null) return '';
                 return 'Total in use: ' + total + ' / ' + hostedRunnerChart.cap;
-              }}
-            }}
-          }}
-        }}
-      }}
-    }});
-  }}
+              }
+            }
+          }
+        }
+      }
+    });
+  }
 
   // Merge queue checks over time
   const mqCanvas = document.getElementById('mqHistory_canvas');
-  if (mqCanvas && hasMqSnapshots) {{
-    charts.mq = new Chart(mqCanvas.getContext('2d'), {{
+  if (mqCanvas && hasMqSnapshots) {
+    charts.mq = new Chart(mqCanvas.getContext('2d'), {
       type: 'line',
-      data: {{
+      data: {
         labels: displayLabels,
         datasets: [
-          {{ label: 'Success (24h)', data: sliceLast(mqSuccessData, n), borderColor: '#28a745', fill: true, backgroundColor: 'rgba(40,167,69,0.1)', tension: 0.3 }},
-          {{ label: 'Failure (24h)', data: sliceLast(mqFailureData, n), borderColor: '#dc3545', fill: true, backgroundColor: 'rgba(220,53,69,0.1)', tension: 0.3 }},
+          { label: 'Success (24h)', data: sliceLast(mqSuccessData, n), borderColor: '#28a745', fill: true, backgroundColor: 'rgba(40,167,69,0.1)', tension: 0.3 },
+          { label: 'Failure (24h)', data: sliceLast(mqFailureData, n), borderColor: '#dc3545', fill: true, backgroundColor: 'rgba(220,53,69,0.1)', tension: 0.3 },
         ]
-      }},
-      options: {{
+      },
+      options: {
         responsive: true,
-        scales: {{ y: {{ min: 0, title: {{ display: true, text: 'Merge Queue Checks' }} }} }}
-      }}
-    }});
-  }}
-}}
+        normalized: true,
+        scales: { y: { min: 0, title: { display: true, text: 'Merge Queue Checks' } } }
+      }
+    });
+  }
+}
 
-function updateHistoryRange() {{
+function updateHistoryRange() {
   const hours = parseInt(document.getElementById('historyRange').value);
   buildCharts(hours);
-}}
+}
 
 // Initial render
 buildCharts(24);
 </script>
-"""
+""")
+
+
+def build_history_chart(snapshots):
+    """Build Chart.js HTML for 24h runner load history."""
+    if not snapshots:
+        return "<p>No history data yet. Snapshots accumulate every 15 minutes.</p>"
+
+    snapshots = _deduplicate_snapshots(snapshots)
+    timestamps = [_round_time(s["timestamp"][11:16]) for s in snapshots]
+
+    # Only show GCP VM groups, exclude scaler host and test runners
+    gcp_vm_groups = GCP_VM_GROUPS
+    palette = GCP_VM_PALETTE
+
+    # Queue depth, active CI workflow runs and per-group VM counts over time
+    columns = _queue_history_columns(snapshots, gcp_vm_groups)
+    queued_data = columns["jobs_queued"]
+    running_data = columns["jobs_running"]
+    runs_in_progress = columns["runs_in_progress"]
+    runs_queued = columns["runs_queued"]
+    group_series = columns["runner_groups"]
+
+    gpu_quota_charts = _build_gpu_quota_charts(snapshots)
+
+    # Hosted-runner usage over time, with the per-org concurrency cap
+    # plotted as a horizontal limit line.
+    hosted_runner_chart = _build_hosted_runner_chart(snapshots)
+
+    # Merge queue cumulative success/failure from snapshots
+    # Each snapshot records the running 24h totals; we just plot them over time.
+    mq_success_data = [
+        None if s.get("merge_queue_partial") else s.get("merge_queue", {}).get("success", 0)
+        for s in snapshots
+    ]
+    mq_failure_data = [
+        None if s.get("merge_queue_partial") else s.get("merge_queue", {}).get("failure", 0)
+        for s in snapshots
+    ]
+    has_mq_snapshots = any(s.get("merge_queue") for s in snapshots)
+    partial_notes = []
+    if any(s.get("queue_partial") for s in snapshots):
+        partial_notes.append("queue")
+    if any(s.get("gpu_quota_partial") for s in snapshots):
+        partial_notes.append("GPU quota")
+    if any(s.get("merge_queue_partial") for s in snapshots):
+        partial_notes.append("merge queue")
+    partial_note_html = ""
+    if partial_notes:
+        partial_note_html = (
+            '<p style="color:#6c757d">Some '
+            + ", ".join(partial_notes)
+            + " samples were partial; affected chart points are rendered as gaps.</p>"
+        )
+
+    charts_html = (
+        chart_section("runnerHistory", "GCP Runner VMs",
+            "Number of GCP-provisioned runner VMs online per group, sampled every 15 minutes.")
+        + chart_section("workflowHistory", "Active CI Workflows",
+            "CI workflow runs currently in progress or queued.")
+        + chart_section("queueHistory", "Job Queue Depth",
+            "Individual jobs waiting in queue vs. actively running on runners.")
+    )
+    for quota_chart in gpu_quota_charts:
+        charts_html += chart_section(
+            quota_chart["id"],
+            f"{quota_chart['name']} GPU Usage vs. Quota",
+            f"{quota_chart['name']} GPUs in use per GCP region, stacked. "
+            "Dashed line shows total quota limit.",
+        )
+    if has_mq_snapshots:
+        charts_html += chart_section("mqHistory", "Merge Queue Checks (24h rolling)",
+            "Rolling 24-hour count of merge queue CI check outcomes, sampled every 15 minutes.")
+    if hosted_runner_chart:
+        charts_html += chart_section(
+            "hostedRunnerHistory",
+            "GitHub-Hosted Runner Usage vs. Cap",
+            "Hosted runners in use (stacked by label) and queued hosted-runner jobs, "
+            "sampled every 15 minutes. Dashed line shows the per-org concurrency cap.",
+        )
+
+    history_json = _js_literal({
+        "timestamps": timestamps,
+        "runnerData": group_series,
+        "runsInProgress": runs_in_progress,
+        "runsQueued": runs_queued,
+        "jobsQueued": queued_data,
+        "jobsRunning": running_data,
+        "gpuQuotaCharts": gpu_quota_charts,
+        "hostedRunnerChart": hosted_runner_chart,
+        "mqSuccessData": mq_success_data,
+        "mqFailureData": mq_failure_data,
+        "hasMqSnapshots": has_mq_snapshots,
+        "runnerColors": palette,
+    })
+
+    return _HISTORY_CHART_HTML.substitute(
+        partial_note_html=partial_note_html,
+        charts_html=charts_html,
+        chartjs_cdn=CHARTJS_CDN,
+        download_js=DOWNLOAD_JS,
+        history_json=history_json,
+    )
 
 
 def render_hosted_runner_usage(hosted_runner_usage):
@@ -1161,50 +1513,65 @@ def render_hosted_runner_usage(hosted_runner_usage):
     return html
 
 
-def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_runner_usage=None):
+BUSY_HTML = '<span style="color:#0d6efd">BUSY</span>'
+IDLE_HTML = '<span style="color:#28a745">IDLE</span>'
+RUNNER_ROW_TMPL = "<tr><td>{name}</td><td>{state}</td><td>{job_info}</td></tr>\n"
+OTHER_RUNNER_ROW_TMPL = "<tr><td>{name}</td><td>{group}</td><td>{state}</td><td>{job_info}</td></tr>\n"
+
+_runner_name = itemgetter("name")
+
+
+def _runner_row_fields(r):
+    """Escaped cell values for a runner table row template."""
+    job_info = ""
+    job = r.get("job")
+    if job:
+        job_name = job.get("name", "")
+        job_branch = job.get("branch", "")
+        job_url = job.get("html_url", "")
+        label = f"{job_name} ({job_branch})" if job_branch else job_name
+        job_info = _link(job_url, label)
+    return {
+        "name": _esc(r.get("name", "")),
+        "group": _esc(r.get("group", "")),
+        "state": BUSY_HTML if r.get("busy", False) else IDLE_HTML,
+        "job_info": job_info,
+    }
+
+
+def generate_health_html(
+    queue_data, failures, output_dir, mq_data=None, hosted_runner_usage=None, now=None
+):
     """Generate health.html from live data."""
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     fetched_at = now.strftime("%Y-%m-%d %H:%M UTC")
 
     # Runner status section — only online GCP VM runners
     GCP_GPU_GROUPS = set(GCP_VM_GROUPS)
-    runners_html = ""
     if queue_data and "self_hosted_runners" in queue_data:
         runners = queue_data["self_hosted_runners"]
-        from collections import defaultdict
         groups = defaultdict(list)
         for r in runners:
+            r.setdefault("name", "")  # so the table sorts can use itemgetter
             g = r.get("group", "Other")
             if g in GCP_GPU_GROUPS and r.get("status") == "online":
                 groups[g].append(r)
 
+        parts = []
         # Show all GCP groups, including ones with 0 online runners (auto-scaling)
         for group_name in sorted(GCP_GPU_GROUPS):
             group_runners = groups.get(group_name, [])
             busy = sum(1 for r in group_runners if r.get("busy"))
             total = len(group_runners)
 
-            runners_html += f'<h3>{_esc(group_name)} ({busy}/{total} busy)</h3>\n'
+            parts.append(f'<h3>{_esc(group_name)} ({busy}/{total} busy)</h3>\n')
             if not group_runners:
-                runners_html += '<p style="color:#6c757d">No runners online (auto-scaling group scales to zero when idle).</p>\n'
+                parts.append('<p style="color:#6c757d">No runners online (auto-scaling group scales to zero when idle).</p>\n')
                 continue
-            runners_html += '<table><tr><th>Runner</th><th>Status</th><th>Current Job</th></tr>\n'
-            for r in sorted(group_runners, key=lambda x: x.get("name", "")):
-                name = _esc(r.get("name", ""))
-                busy_flag = r.get("busy", False)
-                state = '<span style="color:#0d6efd">BUSY</span>' if busy_flag else '<span style="color:#28a745">IDLE</span>'
-
-                job_info = ""
-                job = r.get("job")
-                if job:
-                    job_name = job.get("name", "")
-                    job_branch = job.get("branch", "")
-                    job_url = job.get("html_url", "")
-                    label = f"{job_name} ({job_branch})" if job_branch else job_name
-                    job_info = _link(job_url, label)
-
-                runners_html += f"<tr><td>{name}</td><td>{state}</td><td>{job_info}</td></tr>\n"
-            runners_html += "</table>\n"
+            parts.append('<table><tr><th>Runner</th><th>Status</th><th>Current Job</th></tr>\n')
+            for r in sorted(group_runners, key=_runner_name):
+                parts.append(RUNNER_ROW_TMPL.format_map(_runner_row_fields(r)))
+            parts.append("</table>\n")
 
         # Other runners (non-GCP GPU, online only)
         other_runners = [
@@ -1213,32 +1580,18 @@ def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_
             and r.get("status") == "online"
         ]
         if other_runners:
-            runners_html += '\n<h3>Other Runners</h3>\n'
-            runners_html += '<table><tr><th>Runner</th><th>Group</th><th>Status</th><th>Current Job</th></tr>\n'
-            for r in sorted(other_runners, key=lambda x: x.get("name", "")):
-                name = _esc(r.get("name", ""))
-                group = _esc(r.get("group", ""))
-                busy_flag = r.get("busy", False)
-                state = '<span style="color:#0d6efd">BUSY</span>' if busy_flag else '<span style="color:#28a745">IDLE</span>'
-
-                job_info = ""
-                job = r.get("job")
-                if job:
-                    job_name = job.get("name", "")
-                    job_branch = job.get("branch", "")
-                    job_url = job.get("html_url", "")
-                    label = f"{job_name} ({job_branch})" if job_branch else job_name
-                    job_info = _link(job_url, label)
-
-                runners_html += f"<tr><td>{name}</td><td>{group}</td><td>{state}</td><td>{job_info}</td></tr>\n"
-            runners_html += "</table>\n"
+            parts.append('\n<h3>Other Runners</h3>\n')
+            parts.append('<table><tr><th>Runner</th><th>Group</th><th>Status</th><th>Current Job</th></tr>\n')
+            for r in sorted(other_runners, key=_runner_name):
+                parts.append(OTHER_RUNNER_ROW_TMPL.format_map(_runner_row_fields(r)))
+            parts.append("</table>\n")
+        runners_html = "".join(parts)
     elif queue_data:
         runners_html = "<p>Runner data not available (may require admin access).</p>"
     else:
         runners_html = "<p>Could not fetch runner status.</p>"
 
     # Queue summary section
-    queue_html = ""
     if queue_data:
         summary = queue_data.get("summary", {})
         partial_html = ""
@@ -1247,7 +1600,7 @@ def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_
                 '<p style="color:#6c757d">Queue sample is partial and may undercount '
                 "running or queued jobs (GitHub Actions API failure during collection).</p>"
             )
-        queue_html = f"""
+        parts = [f"""
 <div>
   <div class="stat-card"><div class="value">{summary.get('jobs_queued', 0)}</div><div class="label">Jobs Queued</div></div>
   <div class="stat-card"><div class="value">{summary.get('jobs_running', 0)}</div><div class="label">Jobs Running</div></div>
@@ -1255,38 +1608,39 @@ def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_
   <div class="stat-card"><div class="value">{summary.get('runs_in_progress', 0)}</div><div class="label">Runs In Progress</div></div>
 </div>
 {partial_html}
-"""
+"""]
         # Queue depth by group
         groups = queue_data.get("queue_by_group", [])
         if groups:
-            queue_html += '\n<h3>Queue Depth by Runner Group</h3>\n'
-            queue_html += '<table><tr><th>Group</th><th>Queued</th><th>Running</th>'
-            if queue_data.get("runners_available"):
-                queue_html += '<th>Runners</th>'
-            queue_html += '</tr>\n'
+            runners_available = queue_data.get("runners_available")
+            parts.append('\n<h3>Queue Depth by Runner Group</h3>\n')
+            parts.append('<table><tr><th>Group</th><th>Queued</th><th>Running</th>')
+            if runners_available:
+                parts.append('<th>Runners</th>')
+            parts.append('</tr>\n')
             for g in groups:
                 name = g.get("name", "")
                 queued = g.get("queued", 0)
                 running = g.get("running", 0)
-                queue_html += f"<tr><td>{_esc(name)}</td><td>{queued}</td><td>{running}</td>"
-                if queue_data.get("runners_available"):
+                parts.append(f"<tr><td>{_esc(name)}</td><td>{queued}</td><td>{running}</td>")
+                if runners_available:
                     runners = g.get("runners", {})
                     idle = runners.get("idle", 0)
                     total = runners.get("total", 0)
                     if total > 0:
-                        queue_html += f"<td>{idle} idle / {total} total</td>"
+                        parts.append(f"<td>{idle} idle / {total} total</td>")
                     elif g.get("self_hosted"):
-                        queue_html += "<td>(org-level)</td>"
+                        parts.append("<td>(org-level)</td>")
                     else:
-                        queue_html += "<td>(cloud)</td>"
-                queue_html += "</tr>\n"
-            queue_html += "</table>\n"
+                        parts.append("<td>(cloud)</td>")
+                parts.append("</tr>\n")
+            parts.append("</table>\n")
 
         # Longest waiting jobs
         waiting = queue_data.get("longest_waiting_jobs", [])[:5]
         if waiting:
-            queue_html += '\n<h3>Longest Waiting Jobs</h3>\n'
-            queue_html += '<table><tr><th>Wait</th><th>Job</th><th>Branch</th></tr>\n'
+            parts.append('\n<h3>Longest Waiting Jobs</h3>\n')
+            parts.append('<table><tr><th>Wait</th><th>Job</th><th>Branch</th></tr>\n')
             for j in waiting:
                 wait_s = j.get("wait_seconds", 0)
                 if wait_s >= 3600:
@@ -1299,13 +1653,13 @@ def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_
                 branch = j.get("branch", "")
                 url = j.get("html_url", "")
                 name_html = _link(url, name)
-                queue_html += f"<tr><td>{wait_str}</td><td>{name_html}</td><td>{_esc(branch)}</td></tr>\n"
-            queue_html += "</table>\n"
+                parts.append(f"<tr><td>{wait_str}</td><td>{name_html}</td><td>{_esc(branch)}</td></tr>\n")
+            parts.append("</table>\n")
+        queue_html = "".join(parts)
     else:
         queue_html = "<p>Could not fetch queue status.</p>"
 
     # Recent failures section
-    failures_html = ""
     failures_partial = False
     failure_entries = failures or []
     if isinstance(failures, dict):
@@ -1317,15 +1671,16 @@ def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_
             "(GitHub Actions API failure during collection).</p>"
         )
     elif failure_entries:
-        failures_html = '<table><tr><th>Branch</th><th>Actor</th><th>Time</th></tr>\n'
+        parts = ['<table><tr><th>Branch</th><th>Actor</th><th>Time</th></tr>\n']
         for f in failure_entries:
             branch = f.get("branch", "")
             actor = f.get("actor", "")
             url = f.get("url", "")
             created = f.get("created_at", "")[:16].replace("T", " ")
             link = _link(url, branch)
-            failures_html += f"<tr><td>{link}</td><td>{_esc(actor)}</td><td>{created}</td></tr>\n"
-        failures_html += "</table>\n"
+            parts.append(f"<tr><td>{link}</td><td>{_esc(actor)}</td><td>{created}</td></tr>\n")
+        parts.append("</table>\n")
+        failures_html = "".join(parts)
     else:
         failures_html = "<p>No recent CI failures.</p>"
 
@@ -1375,7 +1730,7 @@ def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_
         mq_html = "<p>Could not fetch merge queue status.</p>"
 
     # Load snapshots and build history chart
-    snapshots = load_snapshots(output_dir, hours=24)
+    snapshots = load_snapshots(output_dir, hours=24, now=now)
     history_html = build_history_chart(snapshots)
 
     hosted_runner_html = render_hosted_runner_usage(hosted_runner_usage)
@@ -1410,65 +1765,76 @@ def generate_health_html(queue_data, failures, output_dir, mq_data=None, hosted_
 def main():
     args = parse_args()
 
-    print(f"Fetching queue status for {args.repo}...")
-    queue_data = fetch_queue_status(args.repo)
-
-    print("Fetching GPU quota...")
-    gpu_quota = fetch_gpu_quota()
-    if gpu_quota:
-        for quota in _normalize_gpu_quota_by_metric(gpu_quota).values():
-            print(f"  {quota.get('name', 'GPU')} GPUs: {quota['usage']}/{quota['limit']} in use")
-        if gpu_quota.get("partial"):
-            print(
-                f"  Warning: GPU quota sample is partial "
-                f"({len(gpu_quota.get('errors', []))} region errors); "
-                f"chart points will render as gaps.",
-                file=sys.stderr,
-            )
-    else:
-        print("  GPU quota unavailable (gcloud not configured or not accessible)")
-
-    print("Fetching merge queue status...")
-    mq_data = fetch_merge_queue_status(args.repo)
-    if mq_data and mq_data.get("partial"):
-        print("  Merge queue data unavailable")
-    elif mq_data:
-        s = mq_data["summary"]
-        print(f"  24h: {s['success']} passed, {s['failure']} failed, {s['cancelled']} cancelled, {s['in_progress']} in progress")
-    else:
-        print("  Merge queue data unavailable")
-
-    print("Sampling GitHub-hosted runner usage...")
-    try:
-        hosted_runner_usage = sample_hosted_runner_usage(args.repo)
-        cap = hosted_runner_usage["cap"]
-        in_use = hosted_runner_usage["in_progress"]["total"]
-        queued = hosted_runner_usage["queued"]["total"]
-        print(f"  Hosted runners in use: {in_use}/{cap}, queued: {queued}")
-        if hosted_runner_usage.get("partial"):
-            fetch_errs = hosted_runner_usage.get("fetch_errors", 0)
-            list_errs = hosted_runner_usage.get("list_errors", [])
-            print(
-                f"  Warning: hosted-runner sample is partial "
-                f"(fetch_errors={fetch_errs}, list_errors={len(list_errs)}); "
-                f"counts above may undercount real usage.",
-                file=sys.stderr,
-            )
-    except Exception as e:  # noqa: BLE001 — sampler must never break the health run
-        print(f"  Warning: hosted-runner sampler failed: {e}", file=sys.stderr)
-        hosted_runner_usage = None
+    # The queue-status subprocess and the recent-failures API query are
+    # independent and I/O bound, so run them in the background while the
+    # remaining samples are collected.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        print(f"Fetching queue status and recent CI failures for {args.repo}...")
+        queue_future = executor.submit(fetch_queue_status, args.repo)
+        failures_future = executor.submit(fetch_recent_failures, args.repo)
+
+        print("Fetching GPU quota...")
+        gpu_quota = fetch_gpu_quota()
+        if gpu_quota:
+            for quota in _normalize_gpu_quota_by_metric(gpu_quota).values():
+                print(f"  {quota.get('name', 'GPU')} GPUs: {quota['usage']}/{quota['limit']} in use")
+            if gpu_quota.get("partial"):
+                print(
+                    f"  Warning: GPU quota sample is partial "
+                    f"({len(gpu_quota.get('errors', []))} region errors); "
+                    f"chart points will render as gaps.",
+                    file=sys.stderr,
+                )
+        else:
+            print("  GPU quota unavailable (gcloud not configured or not accessible)")
+
+        print("Fetching merge queue status...")
+        mq_data = fetch_merge_queue_status(args.repo)
+        if mq_data and mq_data.get("partial"):
+            print("  Merge queue data unavailable")
+        elif mq_data:
+            s = mq_data["summary"]
+            print(f"  24h: {s['success']} passed, {s['failure']} failed, {s['cancelled']} cancelled, {s['in_progress']} in progress")
+        else:
+            print("  Merge queue data unavailable")
 
-    print("Recording snapshot...")
-    record_snapshot(
-        queue_data,
-        args.output,
-        gpu_quota=gpu_quota,
-        mq_data=mq_data,
-        hosted_runner_usage=hosted_runner_usage,
-    )
+        print("Sampling GitHub-hosted runner usage...")
+        try:
+            hosted_runner_usage = sample_hosted_runner_usage(args.repo)
+            cap = hosted_runner_usage["cap"]
+            in_use = hosted_runner_usage["in_progress"]["total"]
+            queued = hosted_runner_usage["queued"]["total"]
+            print(f"  Hosted runners in use: {in_use}/{cap}, queued: {queued}")
+            if hosted_runner_usage.get("partial"):
+                fetch_errs = hosted_runner_usage.get("fetch_errors", 0)
+                list_errs = hosted_runner_usage.get("list_errors", [])
+                print(
+                    f"  Warning: hosted-runner sample is partial "
+                    f"(fetch_errors={fetch_errs}, list_errors={len(list_errs)}); "
+                    f"counts above may undercount real usage.",
+                    file=sys.stderr,
+                )
+        except Exception as e:  # noqa: BLE001 — sampler must never break the health run
+            print(f"  Warning: hosted-runner sampler failed: {e}", file=sys.stderr)
+            hosted_runner_usage = None
+
+        queue_data = queue_future.result()
+
+        # One clock sample per run keeps the snapshot timestamp, the history
+        # window and the "Last updated" banner in agreement.
+        now = datetime.now(timezone.utc)
+
+        print("Recording snapshot...")
+        record_snapshot(
+            queue_data,
+            args.output,
+            gpu_quota=gpu_quota,
+            mq_data=mq_data,
+            hosted_runner_usage=hosted_runner_usage,
+            now=now,
+        )
 
-    print("Fetching recent CI failures...")
-    failures = fetch_recent_failures(args.repo)
+        failures = failures_future.result()
 
     print(f"Generating health.html in {args.output}/...")
     generate_health_html(
@@ -1477,8 +1843,14 @@ def main():
         args.output,
         mq_data=mq_data,
         hosted_runner_usage=hosted_runner_usage,
+        now=now,
     )
 
+    try:
+        rotate_snapshots(args.output, now=now)
+    except Exception as e:  # noqa: BLE001 — housekeeping must never block publishing
+        print(f"Warning: snapshot rotation failed: {e}", file=sys.stderr)
+
     print("Done.")
 
 
@@ -5,6 +5,7 @@ import json
 import os
 import sys
 import tempfile
+import time
 import unittest
 from datetime import datetime, timezone
 from unittest import mock
@@ -428,9 +429,11 @@ class TestGpuQuota(unittest.TestCase):
             with open(os.path.join(tmp, ci_health.SNAPSHOTS_FILE), encoding="utf-8") as f:
                 snapshot = json.loads(f.readline())
 
-        self.assertEqual(snapshot["gpu_quota"]["us-central1"], {"usage": 6, "limit": 8})
-        self.assertEqual(snapshot["gpu_quota"]["us-east1"], {"usage": 7, "limit": 8})
-        self.assertEqual(snapshot["gpu_quota"]["us-west1"], {"usage": 5, "limit": 8})
+        self.assertNotIn("gpu_quota", snapshot)
+        t4_regions = snapshot["gpu_quota_by_metric"]["NVIDIA_T4_GPUS"]["regions"]
+        self.assertEqual(t4_regions["us-central1"], {"usage": 6, "limit": 8})
+        self.assertEqual(t4_regions["us-east1"], {"usage": 7, "limit": 8})
+        self.assertEqual(t4_regions["us-west1"], {"usage": 5, "limit": 8})
         self.assertEqual(
             snapshot["gpu_quota_by_metric"]["NVIDIA_L4_GPUS"]["regions"]["us-east1"],
             {"usage": 1, "limit": 16},
@@ -593,6 +596,51 @@ class TestHealthPartialRendering(unittest.TestCase):
         self.assertIn("Queue sample is partial", html)
 
 
+class TestQueueStatusCache(unittest.TestCase):
+    def _fetch_twice(self, payload):
+        result = mock.Mock(returncode=0, stdout=json.dumps(payload), stderr="")
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "queue.json")
+            with mock.patch.object(ci_health, "_queue_status_cache_path", return_value=cache_path):
+                with mock.patch("ci_health.subprocess.run", return_value=result) as run:
+                    first = ci_health.fetch_queue_status("shader-slang/slang")
+                    second = ci_health.fetch_queue_status("shader-slang/slang")
+        return first, second, run.call_count
+
+    def test_complete_output_is_reused_within_ttl(self):
+        first, second, calls = self._fetch_twice({"summary": {"jobs_queued": 2}})
+        self.assertEqual(first, second)
+        self.assertEqual(calls, 1)
+
+    def test_partial_output_is_not_cached(self):
+        _, _, calls = self._fetch_twice({"partial": True, "summary": {}})
+        self.assertEqual(calls, 2)
+
+    def test_future_mtime_cache_is_ignored(self):
+        result = mock.Mock(returncode=0, stdout=json.dumps({"summary": {}}), stderr="")
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "queue.json")
+            with open(cache_path, "w") as f:
+                json.dump({"summary": {"jobs_queued": 99}}, f)
+            future = time.time() + 3600
+            os.utime(cache_path, (future, future))
+            with mock.patch.object(ci_health, "_queue_status_cache_path", return_value=cache_path):
+                with mock.patch("ci_health.subprocess.run", return_value=result) as run:
+                    data = ci_health.fetch_queue_status("shader-slang/slang")
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(data, {"summary": {}})
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "needs POSIX ownership")
+    def test_cache_dir_is_private(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch("ci_health.tempfile.gettempdir", return_value=tmp):
+                path = ci_health._queue_status_cache_path("shader-slang/slang")
+                self.assertEqual(os.path.commonpath([tmp, path]), tmp)
+                self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o700)
+                os.chmod(os.path.dirname(path), 0o755)
+                self.assertIsNone(ci_health._queue_status_cache_path("shader-slang/slang"))
+
+
 class TestHealthApiBounds(unittest.TestCase):
     def test_recent_failures_query_is_bounded_by_created_range(self):
         calls = []
@@ -601,11 +649,12 @@ class TestHealthApiBounds(unittest.TestCase):
             calls.append((endpoint, key))
             return [], None
 
-        with mock.patch.object(gh_api, "gh_api_list", side_effect=fake_list):
+        with mock.patch.object(ci_health, "gh_api_list", side_effect=fake_list):
             ci_health.fetch_recent_failures("shader-slang/slang")
 
         self.assertEqual(calls[0][1], "workflow_runs")
-        self.assertIn("status=completed", calls[0][0])
+        self.assertIn("/actions/workflows/ci.yml/runs", calls[0][0])
+        self.assertIn("status=failure", calls[0][0])
         self.assertIn("per_page=100", calls[0][0])
         self.assertIn("&created=", calls[0][0])
         self.assertIn("..", calls[0][0])
@@ -617,7 +666,7 @@ class TestHealthApiBounds(unittest.TestCase):
             calls.append((endpoint, key))
             return [], None
 
-        with mock.patch.object(gh_api, "gh_api_list", side_effect=fake_list):
+        with mock.patch.object(ci_health, "gh_api_list", side_effect=fake_list):
             result = ci_health.fetch_merge_queue_status("shader-slang/slang")
 
         self.assertEqual(calls[0][1], "workflow_runs")
@@ -886,6 +935,18 @@ class TestUtilityBehavior(unittest.TestCase):
         self.assertEqual(ci_health._round_time("12:59"), "12:45")
         self.assertEqual(ci_health._round_time("00:01"), "00:00")
 
+    def test_queue_history_columns_extracts_series_in_one_pass(self):
+        snapshots = [
+            {"jobs_queued": 1, "runs_queued": 2, "runner_groups": {"Linux GPU (GCP)": {"total": 3}}},
+            {"jobs_queued": 9, "queue_partial": True},
+            {"jobs_running": 4},
+        ]
+        columns = ci_health._queue_history_columns(snapshots, ["Linux GPU (GCP)"])
+        self.assertEqual(columns["jobs_queued"], [1, None, 0])
+        self.assertEqual(columns["jobs_running"], [0, None, 4])
+        self.assertEqual(columns["runs_queued"], [2, None, 0])
+        self.assertEqual(columns["runner_groups"], {"Linux GPU (GCP)": [3, None, 0]})
+
     def test_deduplicate_snapshots_uses_latest_by_rounded_window(self):
         snapshots = [
             {"timestamp": "2026-03-03T10:00:00Z", "v": 1},
@@ -911,6 +972,208 @@ class TestUtilityBehavior(unittest.TestCase):
 
         self.assertEqual([s["id"] for s in snaps], [2])
 
+    def test_load_snapshots_skips_parsing_old_lines(self):
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        old_ts = (now - ci_health.timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        new_ts = (now - ci_health.timedelta(minutes=10)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ci_health.SNAPSHOTS_FILE)
+            with open(path, "w", encoding="utf-8") as f:
+                for i in range(3):
+                    f.write(json.dumps({"timestamp": old_ts, "id": i}) + "\n")
+                f.write(json.dumps({"timestamp": new_ts, "id": 3}) + "\n")
+
+            with mock.patch.object(ci_health, "_json_loads", wraps=ci_health._json_loads) as loads:
+                snaps = ci_health.load_snapshots(tmp, hours=1)
+
+        self.assertEqual([s["id"] for s in snaps], [3])
+        self.assertEqual(loads.call_count, 1)
+
+    def test_iter_jsonl_tail_yields_lines_newest_first(self):
+        lines = [f'{{"id":{i},"name":"région-{i}"}}'.encode("utf-8") for i in range(20)]
+
+        self.assertEqual(
+            list(ci_health._iter_jsonl_tail(b"\n".join(lines) + b"\n\n")),
+            list(reversed(lines)),
+        )
+        self.assertEqual(list(ci_health._iter_jsonl_tail(b"a\nb")), [b"b", b"a"])
+
+    def test_load_snapshots_handles_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            open(os.path.join(tmp, ci_health.SNAPSHOTS_FILE), "wb").close()
+            self.assertEqual(ci_health.load_snapshots(tmp), [])
+
+    def test_rotate_snapshots_compacts_old_records_into_hourly_archive(self):
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        old_hour = (now - ci_health.timedelta(days=10)).replace(minute=0, second=0)
+        recent_ts = (now - ci_health.timedelta(minutes=10)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        records = [
+            {
+                "timestamp": (old_hour + ci_health.timedelta(minutes=m)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "jobs_queued": q,
+                "runner_groups": {"Linux GPU (GCP)": {"busy": q, "total": 4}},
+                "queue_by_group": {"Linux GPU (GCP)": {"queued": q, "running": 2}},
+                "gpu_quota_by_metric": {
+                    "NVIDIA_T4_GPUS": {
+                        "name": "T4",
+                        "usage": q,
+                        "limit": 8,
+                        "regions": {"us-east1": {"usage": q, "limit": 8}},
+                    },
+                },
+                "merge_queue": {"success": q, "failure": 1, "cancelled": 0, "in_progress": 0},
+                "hosted_runner_usage": {
+                    "cap": 20,
+                    "in_progress": {
+                        "total": q,
+                        "by_label": [{"label": "ubuntu-latest", "count": q}],
+                    },
+                    "queued": {"total": 1},
+                },
+            }
+            for m, q in ((0, 1), (15, 3))
+        ]
+        # Partial samples are left out of each section's average.
+        records.append({
+            "timestamp": (old_hour + ci_health.timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "queue_partial": True,
+            "gpu_quota_partial": True,
+            "gpu_quota_by_metric": {"NVIDIA_T4_GPUS": {"usage": 100, "regions": {}}},
+            "merge_queue_partial": True,
+            "hosted_runner_usage": {"partial": True, "in_progress": {"total": 100}},
+        })
+        # A run without queue data must not dilute the queue averages.
+        records.append({
+            "timestamp": (old_hour + ci_health.timedelta(minutes=45)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "merge_queue_partial": True,
+        })
+        records.append({"timestamp": recent_ts, "jobs_queued": 7})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ci_health.SNAPSHOTS_FILE)
+            with open(path, "w", encoding="utf-8") as f:
+                for r in records:
+                    f.write(json.dumps(r) + "\n")
+
+            ci_health.rotate_snapshots(tmp)
+
+            with open(path, encoding="utf-8") as f:
+                hot = [json.loads(line) for line in f]
+            archive = os.path.join(
+                tmp, ci_health.SNAPSHOT_ARCHIVE_FILE.format(month=old_hour.strftime("%Y-%m"))
+            )
+            with ci_health.gzip.open(archive, "rt", encoding="utf-8") as f:
+                rollups = [json.loads(line) for line in f]
+
+        self.assertEqual(hot, [records[-1]])
+        self.assertEqual(len(rollups), 1)
+        self.assertEqual(rollups[0]["timestamp"], old_hour.strftime("%Y-%m-%dT%H:00:00Z"))
+        rollup = rollups[0]
+        self.assertEqual(rollup["samples"], 4)
+        self.assertEqual(rollup["jobs_queued"], 2)
+        self.assertEqual(rollup["runner_groups"]["Linux GPU (GCP)"], {"busy": 2, "total": 4})
+        self.assertEqual(rollup["queue_by_group"]["Linux GPU (GCP)"], {"queued": 2, "running": 2})
+        self.assertEqual(
+            rollup["gpu_quota_by_metric"]["NVIDIA_T4_GPUS"],
+            {"name": "T4", "usage": 2, "limit": 8, "regions": {"us-east1": {"usage": 2, "limit": 8}}},
+        )
+        self.assertEqual(
+            rollup["merge_queue"], {"success": 2, "failure": 1, "cancelled": 0, "in_progress": 0}
+        )
+        self.assertEqual(
+            rollup["hosted_runner_usage"],
+            {
+                "cap": 20,
+                "in_progress": {"total": 2, "by_label": [{"label": "ubuntu-latest", "count": 2}]},
+                "queued": {"total": 1},
+            },
+        )
+
+    def test_rotate_snapshots_skips_garbled_leading_line(self):
+        old_ts = (datetime.now(timezone.utc) - ci_health.timedelta(days=10)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ci_health.SNAPSHOTS_FILE)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('{"timest\n')
+                f.write(json.dumps({"timestamp": old_ts, "jobs_queued": 1}) + "\n")
+
+            ci_health.rotate_snapshots(tmp)
+
+            self.assertEqual(os.path.getsize(path), 0)
+            self.assertEqual(len(os.listdir(tmp)), 2)
+
+    def test_rotate_snapshots_keeps_recent_records_the_prefilter_misses(self):
+        now = datetime.now(timezone.utc)
+        old_ts = (now - ci_health.timedelta(days=10)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        recent_ts = (now - ci_health.timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        reordered = json.dumps({"jobs_queued": 5, "timestamp": recent_ts}) + "\n"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ci_health.SNAPSHOTS_FILE)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"timestamp": old_ts, "jobs_queued": 1}) + "\n")
+                f.write("123\n")
+                f.write(reordered)
+
+            ci_health.rotate_snapshots(tmp)
+
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), reordered)
+
+    def test_rotate_snapshots_removes_temp_file_on_failure(self):
+        old_ts = (datetime.now(timezone.utc) - ci_health.timedelta(days=10)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ci_health.SNAPSHOTS_FILE)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"timestamp": old_ts}) + "\n")
+
+            with mock.patch.object(ci_health.gzip, "open", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    ci_health.rotate_snapshots(tmp)
+
+            self.assertEqual(os.listdir(tmp), [ci_health.SNAPSHOTS_FILE])
+
+    def test_rotate_snapshots_waits_a_day_past_retention(self):
+        ts = (datetime.now(timezone.utc) - ci_health.timedelta(days=7, hours=12)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ci_health.SNAPSHOTS_FILE)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"timestamp": ts}) + "\n")
+
+            ci_health.rotate_snapshots(tmp)
+
+            self.assertEqual(os.listdir(tmp), [ci_health.SNAPSHOTS_FILE])
+
+    def test_record_and_load_snapshots_share_run_clock(self):
+        now = datetime(2026, 3, 3, 10, 7, 30, tzinfo=timezone.utc)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ci_health.record_snapshot({"summary": {}}, tmp, now=now)
+            snaps = ci_health.load_snapshots(tmp, hours=1, now=now)
+
+        self.assertEqual([s["timestamp"] for s in snaps], ["2026-03-03T10:07:30Z"])
+
+    def test_record_snapshot_raises_on_short_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch("ci_health.os.write", return_value=1):
+                with self.assertRaisesRegex(OSError, "short write"):
+                    ci_health.record_snapshot({"summary": {}}, tmp)
+
+    def test_snapshot_round_trip_without_orjson(self):
+        queue_data = {"summary": {"jobs_queued": 3}, "self_hosted_runners": []}
+
+        with mock.patch.object(ci_health, "orjson", None):
+            with tempfile.TemporaryDirectory() as tmp:
+                ci_health.record_snapshot(queue_data, tmp)
+                snaps = ci_health.load_snapshots(tmp, hours=1)
+
+        self.assertEqual(len(snaps), 1)
+        self.assertEqual(snaps[0]["jobs_queued"], 3)
+
 
 class TestStatusPage(unittest.TestCase):
     def test_generate_with_entries(self):